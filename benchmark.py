@@ -0,0 +1,969 @@
+# -*- coding: utf-8 -*-
+# Офлайн-бенчмарк ImageBot: локальные заглушки хостов и фейковый Telegram.
+# Пример: python benchmark.py --source imgur --length 5 --users 1,10,100 --duration 30
+# Регрессии по записанным ответам: python benchmark.py record --cassette cas --probes 2000,
+# затем python benchmark.py replay --cassette cas --json base.json до изменения
+# и python benchmark.py replay --cassette cas --baseline base.json после
+import argparse
+import asyncio
+import hashlib
+import http.client
+import json
+import logging
+import random
+import string
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from telegram.error import RetryAfter
+
+from bot import (
+    ImageBot,
+    CodeGenerator,
+    InMemoryBroker,
+    SOURCE_ALPHABETS,
+    SEQUENTIAL_SOURCES,
+    logger as bot_logger,
+)
+
+UPSTREAM_HOSTS = [
+    "i.imgur.com",
+    "prnt.sc",
+    "image.prntscr.com",
+    "st.prntscr.com",
+    "ru.paste.pics",
+    "iili.io",
+]
+
+# Хост, к которому обращается первая проверка кандидата для каждого источника
+PROBE_HOSTS = {
+    "imgur": "i.imgur.com",
+    "prnt": "prnt.sc",
+    "pastenow": "ru.paste.pics",
+    "freeimage": "iili.io",
+}
+
+
+def make_jpeg(width: int, height: int, size: int) -> bytes:
+    app0 = b"\xFF\xE0" + struct.pack(">H", 16) + b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    sof0 = b"\xFF\xC0" + struct.pack(">HBHHB", 17, 8, height, width, 3) + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+    head = b"\xFF\xD8" + app0 + sof0
+    return head + b"\x00" * max(0, size - len(head) - 2) + b"\xFF\xD9"
+
+
+def make_png(width: int, height: int, size: int) -> bytes:
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    head = b"\x89PNG\r\n\x1a\n" + chunk
+    return head + b"\x00" * max(0, size - len(head))
+
+
+def make_gif(width: int, height: int, size: int) -> bytes:
+    head = b"GIF89a" + struct.pack("<HH", width, height) + b"\x00\x00\x00"
+    return head + b"\x00" * max(0, size - len(head) - 1) + b";"
+
+
+IMAGE_MAKERS = {"jpg": (make_jpeg, "image/jpeg"), "png": (make_png, "image/png"), "gif": (make_gif, "image/gif")}
+
+
+class HostProfile:
+    def __init__(
+        self,
+        hit_ratio: float = 0.05,
+        placeholder_ratio: float = 0.02,
+        latency_ms: float = 50.0,
+        jitter: float = 0.3,
+        slow_ratio: float = 0.0,
+        slow_ms: float = 5000.0,
+        burst_period: float = 0.0,
+        burst_duration: float = 0.0,
+        retry_after: int = 5,
+        client_rate: float = 0.0,
+        image_size: int = 32 * 1024,
+        width: int = 800,
+        height: int = 600,
+        formats: Optional[Dict[str, float]] = None,
+    ):
+        self.hit_ratio = hit_ratio
+        self.placeholder_ratio = placeholder_ratio
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.slow_ratio = slow_ratio
+        self.slow_ms = slow_ms
+        self.burst_period = burst_period
+        self.burst_duration = burst_duration
+        self.retry_after = retry_after
+        self.client_rate = client_rate
+        self.image_size = image_size
+        self.width = width
+        self.height = height
+        # Доли форматов находок: картинка отдаётся только под своим расширением, как у iili.io.
+        # None — любой формат под любым расширением, как у imgur
+        self.formats = formats
+
+    def delay(self) -> float:
+        if self.slow_ratio and random.random() < self.slow_ratio:
+            return self.slow_ms / 1000
+        if self.latency_ms <= 0:
+            return 0.0
+        return random.lognormvariate(0, self.jitter) * self.latency_ms / 1000 if self.jitter else self.latency_ms / 1000
+
+    def throttled(self, now: float) -> bool:
+        return self.burst_period > 0 and (now % self.burst_period) < self.burst_duration
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class MockUpstream:
+    def __init__(self, profiles: Dict[str, HostProfile], seed: int = 0):
+        self.profiles = profiles
+        self.seed = seed
+        self.counters: Dict[str, int] = {}
+        self.windows: Dict[Tuple[str, str], List[int]] = {}
+        self.lock = threading.Lock()
+        self.server: Optional[QuietHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def count(self, key: str, n: int = 1):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def over_budget(self, client: str, host: str, rate: float) -> bool:
+        # Лимит запросов в секунду с одного адреса: адрес прокси приходит в X-Forwarded-For
+        window = int(time.time())
+        with self.lock:
+            stats = self.windows.setdefault((client, host), [window, 0])
+            if stats[0] != window:
+                stats[:] = [window, 0]
+            stats[1] += 1
+            return stats[1] > rate
+
+    def classify(self, host: str, code: str) -> str:
+        profile = self.profiles[host]
+        digest = hashlib.blake2b(f"{self.seed}:{host}:{code}".encode(), digest_size=8).digest()
+        roll = int.from_bytes(digest, "big") / 2 ** 64
+        if roll < profile.hit_ratio:
+            return "hit"
+        if roll < profile.hit_ratio + profile.placeholder_ratio:
+            return "placeholder"
+        return "miss"
+
+    def hit_format(self, host: str, code: str) -> str:
+        formats = self.profiles[host].formats
+        digest = hashlib.blake2b(f"{self.seed}:format:{host}:{code}".encode(), digest_size=8).digest()
+        roll = int.from_bytes(digest, "big") / 2 ** 64 * sum(formats.values())
+        for fmt, share in formats.items():
+            roll -= share
+            if roll < 0:
+                return fmt
+        return fmt
+
+    def start(self) -> "MockUpstream":
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                upstream.handle(self, head=True)
+
+            def do_GET(self):
+                upstream.handle(self, head=False)
+
+        self.server = QuietHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def handle(self, req: BaseHTTPRequestHandler, head: bool):
+        host = req.headers.get("Host", "").split(":")[0]
+        path = urlsplit(req.path).path
+        profile = self.profiles.get(host) or self.profiles.get("i.imgur.com")
+        delay = profile.delay()
+        if delay:
+            time.sleep(delay)
+        if host == PROBE_HOSTS["prnt"] or (host == PROBE_HOSTS["pastenow"] and not path.startswith("/images/")):
+            self.count(f"probe:{host}")
+        elif host in (PROBE_HOSTS["imgur"], PROBE_HOSTS["freeimage"]) and head and path != "/removed.png":
+            self.count(f"probe:{host}")
+        client = req.headers.get("X-Forwarded-For") or req.client_address[0]
+        if profile.throttled(time.time()) or (profile.client_rate and self.over_budget(client, host, profile.client_rate)):
+            self.count(f"429:{host}")
+            return self.reply(req, 429, b"Too Many Requests", "text/plain", head, {"Retry-After": str(profile.retry_after)})
+        code = path.rsplit("/", 1)[-1].split(".")[0]
+        if host in ("i.imgur.com", "iili.io"):
+            if path == "/removed.png":
+                return self.reply(req, 200, make_png(161, 81, 503), "image/png", head)
+            kind = self.classify(host, code)
+            if kind == "hit" and profile.formats:
+                fmt = self.hit_format(host, code)
+                if not path.endswith(f".{fmt}"):
+                    return self.reply(req, 404, b"Not Found", "text/plain", head)
+                make, content_type = IMAGE_MAKERS[fmt]
+                return self.reply(req, 200, make(profile.width, profile.height, profile.image_size), content_type, head)
+            if kind == "hit":
+                return self.reply(req, 200, make_jpeg(profile.width, profile.height, profile.image_size), "image/jpeg", head)
+            if kind == "placeholder" and host == "i.imgur.com":
+                return self.reply(req, 302, b"", "text/html", head, {"Location": "https://i.imgur.com/removed.png"})
+            return self.reply(req, 404, b"Not Found", "text/plain", head)
+        if host == "prnt.sc":
+            # prnt.sc не отдаёт 404: для несуществующего кода показывается заглушка
+            kind = self.classify(host, code)
+            if kind == "hit":
+                src = f"https://image.prntscr.com/image/{code}.png"
+            else:
+                src = "//st.prntscr.com/placeholder/0_173a7b_211be8ff.png"
+            html = f'<html><body><img class="screenshot-image" src="{src}"></body></html>'
+            return self.reply(req, 200, html.encode(), "text/html", head)
+        if host == "ru.paste.pics" and not path.startswith("/images/"):
+            kind = self.classify(host, code)
+            if kind == "miss":
+                return self.reply(req, 404, b"Not Found", "text/plain", head)
+            src = f"https://ru.paste.pics/images/{code}.png" if kind == "hit" else "https://ru.paste.pics/img/placeholder.png"
+            html = f'<html><body><div id="content"><img src="{src}"></div></body></html>'
+            return self.reply(req, 200, html.encode(), "text/html", head)
+        if host in ("image.prntscr.com", "ru.paste.pics"):
+            return self.reply(req, 200, make_png(profile.width, profile.height, profile.image_size), "image/png", head)
+        return self.reply(req, 404, b"Not Found", "text/plain", head)
+
+    def reply(self, req, status: int, body: bytes, content_type: str, head: bool, extra: Optional[Dict[str, str]] = None):
+        self.count(f"{status}")
+        req.send_response(status)
+        req.send_header("Content-Type", content_type)
+        req.send_header("Content-Length", str(len(body)))
+        for key, value in (extra or {}).items():
+            req.send_header(key, value)
+        req.end_headers()
+        if not head:
+            try:
+                req.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+
+# Перенаправляет запросы к известным хостам на локальную заглушку
+class LocalRouteAdapter(HTTPAdapter):
+    def __init__(self, address: str, hosts: List[str], **kwargs):
+        self.address = address
+        self.hosts = set(hosts)
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.hostname in self.hosts:
+            request.headers["Host"] = parts.hostname
+            query = f"?{parts.query}" if parts.query else ""
+            request.url = f"http://{self.address}{parts.path or '/'}{query}"
+        return super().send(request, **kwargs)
+
+
+def route_to_upstream(bot: ImageBot, upstream: MockUpstream):
+    adapter = LocalRouteAdapter(upstream.address, UPSTREAM_HOSTS, pool_connections=16, pool_maxsize=256)
+    bot.http.mount("https://", adapter)
+    bot.http.mount("http://", adapter)
+
+
+# Локальный прямой прокси: пересылает запрос на заглушку от своего имени
+class StandInProxy:
+    def __init__(self, upstream: MockUpstream, name: str):
+        self.upstream = upstream
+        self.name = name
+        self.server: Optional[QuietHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInProxy":
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                proxy.forward(self, "HEAD")
+
+            def do_GET(self):
+                proxy.forward(self, "GET")
+
+        self.server = QuietHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def forward(self, req: BaseHTTPRequestHandler, method: str):
+        parts = urlsplit(req.path)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        conn = http.client.HTTPConnection(self.upstream.address, timeout=30)
+        try:
+            conn.request(method, path, headers={"Host": parts.hostname, "X-Forwarded-For": self.name})
+            response = conn.getresponse()
+            body = response.read()
+        finally:
+            conn.close()
+        req.send_response(response.status)
+        for key, value in response.getheaders():
+            if key.lower() not in ("connection", "transfer-encoding", "date", "server"):
+                req.send_header(key, value)
+        req.end_headers()
+        if method != "HEAD":
+            try:
+                req.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+
+# Запрос к известному хосту уходит через прокси как обычный http:// (без CONNECT)
+class ProxyRouteAdapter(HTTPAdapter):
+    def __init__(self, hosts: List[str], **kwargs):
+        self.hosts = set(hosts)
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.hostname in self.hosts and parts.scheme == "https":
+            request.url = "http" + request.url[len("https"):]
+        return super().send(request, **kwargs)
+
+
+def route_through_proxies(bot: ImageBot, upstream: MockUpstream, count: int, rate: Optional[float]) -> List[StandInProxy]:
+    proxies = [StandInProxy(upstream, f"10.0.0.{i + 1}").start() for i in range(count)]
+    pool = bot.use_proxies([proxy.url for proxy in proxies], rate=rate)
+    for egress in pool.proxies:
+        egress.adapter = ProxyRouteAdapter(UPSTREAM_HOSTS, pool_connections=8, pool_maxsize=256)
+    return proxies
+
+
+class FakeTelegram:
+    def __init__(self, retry_ratio: float = 0.0, retry_after: int = 1, latency_ms: float = 0.0):
+        self.retry_ratio = retry_ratio
+        self.retry_after = retry_after
+        self.latency_ms = latency_ms
+        self.calls: List[Tuple[float, int, str, int]] = []
+        self.delivered: Dict[int, List[float]] = {}
+        self.retries = 0
+
+    async def call(self, user_id: int, method: str, images: int = 0, throttle: bool = True):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if throttle and self.retry_ratio and random.random() < self.retry_ratio:
+            self.retries += 1
+            raise RetryAfter(self.retry_after)
+        now = time.monotonic()
+        self.calls.append((now, user_id, method, images))
+        if images:
+            self.delivered.setdefault(user_id, []).extend([now] * images)
+
+    def update_for(self, user_id: int) -> "FakeUpdate":
+        return FakeUpdate(self, user_id)
+
+
+class FakeMessage:
+    def __init__(self, tg: FakeTelegram, user_id: int):
+        self.tg = tg
+        self.user_id = user_id
+
+    async def reply_text(self, text, **kwargs):
+        await self.tg.call(self.user_id, "reply_text", throttle=False)
+        return FakeMessage(self.tg, self.user_id)
+
+    async def reply_media_group(self, media, **kwargs):
+        await self.tg.call(self.user_id, "reply_media_group", images=len(media))
+        return [FakeMessage(self.tg, self.user_id) for _ in media]
+
+    async def reply_photo(self, photo, **kwargs):
+        await self.tg.call(self.user_id, "reply_photo", images=1)
+        return FakeMessage(self.tg, self.user_id)
+
+    async def reply_animation(self, animation, **kwargs):
+        await self.tg.call(self.user_id, "reply_animation", images=1)
+        return FakeMessage(self.tg, self.user_id)
+
+    async def edit_text(self, text, **kwargs):
+        await self.tg.call(self.user_id, "edit_text")
+        return self
+
+    async def delete(self):
+        await self.tg.call(self.user_id, "delete", throttle=False)
+        return True
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class FakeUpdate:
+    def __init__(self, tg: FakeTelegram, user_id: int):
+        self.effective_user = FakeUser(user_id)
+        self.message = FakeMessage(tg, user_id)
+
+
+class FakeContext:
+    def __init__(self, args: List[str]):
+        self.args = args
+        self.user_data: Dict = {}
+
+
+def search_handler(bot: ImageBot, source: str):
+    return {
+        "imgur": bot.get_imgur_images,
+        "prnt": bot.get_prnt_images,
+        "pastenow": bot.get_pastenow_images,
+        "freeimage": bot.get_freeimage_images,
+        "any": bot.get_any_images,
+    }[source]
+
+
+def search_args(source: str, length: int, count: int) -> List[str]:
+    return [str(length), str(count)] if source == "imgur" else [str(count)]
+
+
+async def run_scenario(
+    users: int,
+    source: str,
+    length: int,
+    count: int,
+    duration: float,
+    profiles: Dict[str, HostProfile],
+    tg: FakeTelegram,
+    workers: int = 0,
+    measure_memory: bool = False,
+    seed: int = 0,
+    shards: int = 0,
+    proxies: int = 0,
+    proxy_rate: Optional[float] = None,
+    max_active: int = 0,
+    max_queue: int = 0,
+) -> Dict:
+    random.seed(seed)
+    upstream = MockUpstream(profiles, seed=seed).start()
+    loop = asyncio.get_running_loop()
+    if workers:
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    bot = ImageBot()
+    bot.admission.max_active = max_active
+    bot.admission.max_queue = max_queue
+    bot.size_bulkheads()
+    if workers:
+        for bulkhead in bot.bulkheads.values():
+            bulkhead.resize(workers, bulkhead.max_queue)
+    route_to_upstream(bot, upstream)
+    stand_ins = route_through_proxies(bot, upstream, proxies, proxy_rate) if proxies else []
+    if shards:
+        bot.use_broker(InMemoryBroker(), shards, shards)
+        await bot.post_init(None)
+    if measure_memory:
+        tracemalloc.start()
+        mem_base = tracemalloc.get_traced_memory()[0]
+    handler = search_handler(bot, source)
+    started = time.monotonic()
+    starts: Dict[int, float] = {}
+    for user_id in range(1, users + 1):
+        starts[user_id] = time.monotonic()
+        await handler(tg.update_for(user_id), FakeContext(search_args(source, length, count)))
+    mem_per_session = None
+    deadline = started + duration
+    while bot.sessions and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+        if measure_memory and mem_per_session is None and time.monotonic() - started >= min(5.0, duration / 2):
+            mem_per_session = (tracemalloc.get_traced_memory()[0] - mem_base) / users
+    for session in list(bot.sessions.values()):
+        session["stop"] = True
+        if session.get("task"):
+            session["task"].cancel()
+    await asyncio.sleep(0.5)
+    for task in bot.worker_tasks:
+        task.cancel()
+    elapsed = time.monotonic() - started
+    if measure_memory:
+        if mem_per_session is None:
+            mem_per_session = (tracemalloc.get_traced_memory()[0] - mem_base) / users
+        tracemalloc.stop()
+    for stand_in in stand_ins:
+        stand_in.stop()
+    upstream.stop()
+    bot.http.close()
+    for bulkhead in bot.bulkheads.values():
+        bulkhead.close()
+
+    hosts = list(PROBE_HOSTS.values()) if source == "any" else [PROBE_HOSTS[source]]
+    probes = sum(upstream.counters.get(f"probe:{host}", 0) for host in hosts)
+    hits = sum(len(v) for v in tg.delivered.values())
+    first_image = [tg.delivered[u][0] - starts[u] for u in tg.delivered if tg.delivered[u]]
+    time_to_n = [tg.delivered[u][count - 1] - starts[u] for u in tg.delivered if len(tg.delivered[u]) >= count]
+    return {
+        "users": users,
+        "source": source,
+        "elapsed_s": round(elapsed, 2),
+        "probes": probes,
+        "probes_per_s": round(probes / elapsed, 2),
+        "hits": hits,
+        "hits_per_s": round(hits / elapsed, 2),
+        "throttled_429": sum(upstream.counters.get(f"429:{host}", 0) for host in hosts),
+        "upstream_requests": sum(n for key, n in upstream.counters.items() if key.isdigit()),
+        "tg_retry_after": tg.retries,
+        "coalesced": bot.single_flight.coalesced + bot.single_flight.memo_hits,
+        "completed_users": len(time_to_n),
+        "time_to_first_p50_s": percentile(first_image, 50),
+        "time_to_n_p50_s": percentile(time_to_n, 50),
+        "time_to_n_p95_s": percentile(time_to_n, 95),
+        "memory_per_session_kb": round(mem_per_session / 1024, 1) if mem_per_session is not None else None,
+        "outcomes": bot.outcome_counts,
+        "url_variants": {src: variants.summary() for src, variants in bot.url_variants.items()},
+        "bulkheads": {src: bulkhead.summary() for src, bulkhead in bot.bulkheads.items()},
+        "admission": bot.admission.summary(),
+        "egress": bot.proxy_pool.summary() if bot.proxy_pool else None,
+    }
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return round(ordered[idx], 2)
+
+
+# Локальная заглушка Redis: подмножество команд, которое использует RedisBroker
+class MiniRedis:
+    def __init__(self):
+        self.data: Dict[str, object] = {}
+        self.expires: Dict[str, float] = {}
+        self.changed = asyncio.Condition()
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def alive(self, key: str):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "MiniRedis":
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _ in range(int(line[1:-2])):
+                    size = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(size + 2))[:-2].decode())
+                writer.write(await self.execute(args))
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def execute(self, args: List[str]) -> bytes:
+        cmd, rest = args[0].upper(), args[1:]
+        if cmd in ("PING", "SELECT"):
+            return b"+OK\r\n" if cmd == "SELECT" else b"+PONG\r\n"
+        if cmd == "LPUSH":
+            items = self.alive(rest[0]) or []
+            for value in rest[1:]:
+                items.insert(0, value)
+            self.data[rest[0]] = items
+            async with self.changed:
+                self.changed.notify_all()
+            return b":%d\r\n" % len(items)
+        if cmd == "BRPOP":
+            key, deadline = rest[0], time.time() + float(rest[-1])
+            async with self.changed:
+                while not self.alive(key):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return b"*-1\r\n"
+                    try:
+                        await asyncio.wait_for(self.changed.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        return b"*-1\r\n"
+                value = self.data[key].pop()
+            return bulk_array([key, value])
+        if cmd == "RPOP":
+            items = self.alive(rest[0])
+            return bulk(items.pop() if items else None)
+        if cmd == "SET":
+            self.data[rest[0]] = rest[1]
+            self.expires.pop(rest[0], None)
+            if len(rest) >= 4 and rest[2].upper() in ("PX", "EX"):
+                ttl = float(rest[3]) / (1000 if rest[2].upper() == "PX" else 1)
+                self.expires[rest[0]] = time.time() + ttl
+            return b"+OK\r\n"
+        if cmd == "GET":
+            value = self.alive(rest[0])
+            return bulk(value)
+        if cmd == "INCR":
+            value = int(self.alive(rest[0]) or 0) + 1
+            self.data[rest[0]] = str(value)
+            return b":%d\r\n" % value
+        if cmd in ("PEXPIRE", "EXPIRE"):
+            if self.alive(rest[0]) is None:
+                return b":0\r\n"
+            self.expires[rest[0]] = time.time() + float(rest[1]) / (1000 if cmd == "PEXPIRE" else 1)
+            return b":1\r\n"
+        if cmd == "SADD":
+            members = self.alive(rest[0]) or set()
+            before = len(members)
+            members.update(rest[1:])
+            self.data[rest[0]] = members
+            return b":%d\r\n" % (len(members) - before)
+        if cmd == "SISMEMBER":
+            members = self.alive(rest[0]) or set()
+            return b":1\r\n" if rest[1] in members else b":0\r\n"
+        if cmd == "DEL":
+            removed = sum(1 for key in rest if self.data.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+        return f"-ERR unknown command '{cmd}'\r\n".encode()
+
+
+def bulk(value: Optional[str]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    data = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def bulk_array(values: List[str]) -> bytes:
+    return b"*%d\r\n" % len(values) + b"".join(bulk(v) for v in values)
+
+
+# Модели пространства кодов для сравнения генераторов без сети
+class SequentialSpace:
+    def __init__(self, alphabet: str, length: int, seed: int = 0):
+        self.gen = CodeGenerator(alphabet, length, sequential=True)
+        self.seed = seed
+        # Выдано около 60% пространства, свежие скриншоты ещё не удалены
+        self.frontier = int(self.gen.space * 0.6)
+        self.recent_span = self.gen.space // 200
+
+    def is_hit(self, code: str) -> bool:
+        value = self.gen.decode(code)
+        if value > self.frontier:
+            return False
+        age = self.frontier - value
+        rate = 0.6 if age < self.recent_span else 0.02
+        return stable_roll(self.seed, code) < rate
+
+
+class ClusteredSpace:
+    def __init__(self, alphabet: str, prefix_len: int = 2, hot_share: float = 0.05,
+                 hot_rate: float = 0.3, cold_rate: float = 0.005, seed: int = 0):
+        self.alphabet = alphabet
+        self.prefix_len = prefix_len
+        self.hot_share = hot_share
+        self.hot_rate = hot_rate
+        self.cold_rate = cold_rate
+        self.seed = seed
+
+    def is_hit(self, code: str) -> bool:
+        hot = stable_roll(self.seed, "prefix:" + code[:self.prefix_len]) < self.hot_share
+        return stable_roll(self.seed, code) < (self.hot_rate if hot else self.cold_rate)
+
+
+def stable_roll(seed: int, key: str) -> float:
+    digest = hashlib.blake2b(f"{seed}:{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+def baseline_code(length: int) -> str:
+    chars = string.ascii_lowercase + string.digits
+    return "".join(random.choice(chars) for _ in range(length))
+
+
+def compare_generators(probes: int, seed: int) -> List[Dict]:
+    # Выигрыш на sequential и clustered заложен в саму модель (свежие коды у границы выдачи,
+    # горячие префиксы): он показывает, как быстро генератор находит такую структуру, а не
+    # что она есть у настоящих хостов. На uniform структуры нет, и выигрыша тоже нет
+    cases = [
+        ("prnt", 6, "sequential", SequentialSpace(SOURCE_ALPHABETS["prnt"], 6, seed)),
+        ("imgur", 5, "uniform", ClusteredSpace(SOURCE_ALPHABETS["imgur"], hot_share=0.0, cold_rate=0.02, seed=seed)),
+        ("imgur", 5, "clustered", ClusteredSpace(SOURCE_ALPHABETS["imgur"], seed=seed)),
+        ("imgur", 7, "clustered", ClusteredSpace(SOURCE_ALPHABETS["imgur"], seed=seed)),
+        ("freeimage", 7, "clustered", ClusteredSpace(SOURCE_ALPHABETS["freeimage"], seed=seed)),
+        ("pastenow", 5, "clustered", ClusteredSpace(SOURCE_ALPHABETS["pastenow"], seed=seed)),
+    ]
+    reports = []
+    for source, length, model, space in cases:
+        random.seed(seed)
+        baseline_hits = sum(space.is_hit(baseline_code(length)) for _ in range(probes))
+        gen = CodeGenerator(SOURCE_ALPHABETS[source], length, sequential=source in SEQUENTIAL_SOURCES, seed=seed)
+        adaptive_hits = 0
+        for _ in range(probes):
+            code = gen.generate()
+            hit = space.is_hit(code)
+            gen.observe(code, hit)
+            adaptive_hits += hit
+        reports.append({
+            "source": source,
+            "length": length,
+            "space": model,
+            "probes": probes,
+            "baseline_hit_rate": round(baseline_hits / probes, 4),
+            "adaptive_hit_rate": round(adaptive_hits / probes, 4),
+            "gain": round(adaptive_hits / baseline_hits, 2) if baseline_hits else None,
+        })
+    return reports
+
+
+def build_profiles(args) -> Dict[str, HostProfile]:
+    profile_kwargs = dict(
+        hit_ratio=args.hit_ratio,
+        placeholder_ratio=args.placeholder_ratio,
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        slow_ratio=args.slow_ratio,
+        slow_ms=args.slow_ms,
+        burst_period=args.burst_period,
+        burst_duration=args.burst_duration,
+        client_rate=args.client_rate,
+    )
+    profiles = {host: HostProfile(**profile_kwargs) for host in UPSTREAM_HOSTS}
+    if args.slow_hosts:
+        slow = {host.strip() for host in args.slow_hosts.split(",")}
+        for host, profile in profiles.items():
+            if host not in slow:
+                profile.slow_ratio = 0.0
+    for item in filter(None, args.host_hit_ratio.split(",")):
+        host, ratio = item.split("=")
+        profiles[host.strip()].hit_ratio = float(ratio)
+    if args.strict_formats:
+        formats = {fmt: float(share) for fmt, share in (item.split("=") for item in args.format_mix.split(","))}
+        for host in filter(None, args.strict_formats.split(",")):
+            profiles[host.strip()].formats = formats
+    # CDN-хосты отдают картинку всегда: кандидат уже отобран на странице
+    for host in ("image.prntscr.com", "st.prntscr.com"):
+        profiles[host] = HostProfile(hit_ratio=1.0, placeholder_ratio=0.0, latency_ms=args.latency_ms, jitter=args.jitter)
+    return profiles
+
+
+async def probe_until(bot: ImageBot, source: str, length: int, probes: Optional[int]) -> Dict:
+    # probes=None — пока не кончатся кандидаты из кассеты в резервуаре
+    batch = bot.search_settings[source]["batch"]
+    analyzed = hits = errors = 0
+    started = time.monotonic()
+    while True:
+        left = probes - analyzed - errors if probes is not None else len(bot.reservoir.codes.get((source, length), []))
+        if left <= 0:
+            break
+        for outcome in await bot.probe_batch(source, length, min(batch, left)):
+            if not outcome.answered:
+                errors += 1
+                continue
+            analyzed += 1
+            hits += outcome.hit
+    elapsed = time.monotonic() - started
+    return {
+        "source": source,
+        "length": length,
+        "probes": analyzed,
+        "errors": errors,
+        "hits": hits,
+        "elapsed_s": round(elapsed, 2),
+        "probes_per_s": round(analyzed / elapsed, 2) if elapsed else None,
+        "hits_per_s": round(hits / elapsed, 2) if elapsed else None,
+    }
+
+
+async def run_cassette(args) -> Dict:
+    if args.workers:
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.workers))
+    bot = ImageBot()
+    upstream = None
+    if args.mode == "record" and not args.live:
+        upstream = MockUpstream(build_profiles(args)).start()
+        route_to_upstream(bot, upstream)
+    cassette = bot.use_cassette(args.cassette, args.mode, args.cassette_speed)
+    try:
+        if args.mode == "record":
+            report = await probe_until(bot, args.source, args.length, args.probes)
+        else:
+            report = await probe_until(bot, args.source, args.length, None)
+            report["cassette_misses"] = bot.http.get_adapter("https://").misses
+    finally:
+        if upstream:
+            upstream.stop()
+    report["mode"] = args.mode
+    report["cassette_entries"] = len(cassette)
+    return report
+
+
+def compare_reports(report: Dict, baseline: Dict, max_regression: float) -> bool:
+    ok = True
+    for metric in ("probes_per_s", "hits_per_s"):
+        before, after = baseline.get(metric), report.get(metric)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        verdict = "OK"
+        if change < -max_regression:
+            verdict = "РЕГРЕССИЯ"
+            ok = False
+        print(f"{metric}: {before} -> {after} ({change:+.1%}) {verdict}")
+    if baseline.get("hits") != report.get("hits"):
+        print(f"hits: {baseline.get('hits')} -> {report.get('hits')} — изменилось число находок на тех же ответах")
+    return ok
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк ImageBot")
+    parser.add_argument("mode", nargs="?", choices=["load", "generators", "broker", "record", "replay"],
+                        default="load",
+                        help="load — нагрузка на ImageBot, generators — сравнение генераторов кодов, "
+                             "broker — локальная заглушка Redis для распределённого режима, "
+                             "record/replay — запись ответов апстримов в кассету и прогон по ней")
+    parser.add_argument("--probes", type=int, default=20000, help="число проверок для режима generators")
+    parser.add_argument("--source", choices=sorted(PROBE_HOSTS) + ["any"], default="imgur",
+                        help="any — смешанный поиск по всем источникам (/getany)")
+    parser.add_argument("--length", type=int, default=5)
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--users", default="1,10,100", help="список числа одновременных пользователей через запятую")
+    parser.add_argument("--duration", type=float, default=30.0, help="лимит времени на сценарий, секунд")
+    parser.add_argument("--hit-ratio", type=float, default=0.05)
+    parser.add_argument("--host-hit-ratio", default="",
+                        help="доля попаданий по хостам, например i.imgur.com=0.01,prnt.sc=0.2")
+    parser.add_argument("--placeholder-ratio", type=float, default=0.02)
+    parser.add_argument("--strict-formats", default="",
+                        help="хосты через запятую, которые отдают находку только под её расширением (iili.io)")
+    parser.add_argument("--format-mix", default="jpg=0.6,png=0.3,gif=0.1",
+                        help="доли форматов находок для --strict-formats")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter", type=float, default=0.3, help="sigma логнормального разброса задержки")
+    parser.add_argument("--slow-ratio", type=float, default=0.0, help="доля очень медленных ответов")
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--slow-hosts", default="", help="медленные ответы только у этих хостов (через запятую)")
+    parser.add_argument("--burst-period", type=float, default=0.0, help="период всплесков 429, секунд")
+    parser.add_argument("--burst-duration", type=float, default=0.0, help="длительность всплеска 429, секунд")
+    parser.add_argument("--client-rate", type=float, default=0.0,
+                        help="лимит запросов в секунду к хосту с одного адреса (0 — без лимита)")
+    parser.add_argument("--max-active", type=int, default=0, help="лимит одновременных поисков (0 — без лимита)")
+    parser.add_argument("--max-queue", type=int, default=0, help="длина очереди поисков сверх лимита")
+    parser.add_argument("--proxies", type=int, default=0, help="число локальных прокси в пуле исходящих адресов")
+    parser.add_argument("--proxy-rate", type=float, help="бюджет запросов в секунду к хосту на один прокси")
+    parser.add_argument("--tg-retry-ratio", type=float, default=0.0, help="вероятность RetryAfter от Telegram")
+    parser.add_argument("--tg-retry-after", type=int, default=1)
+    parser.add_argument("--tg-latency-ms", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=0, help="размер пула потоков (0 — по умолчанию)")
+    parser.add_argument("--shards", type=int, default=0, help="искать через воркеры в памяти (число шардов)")
+    parser.add_argument("--port", type=int, default=6379, help="порт заглушки Redis для режима broker")
+    parser.add_argument("--memory", action="store_true", help="измерять память на сессию (tracemalloc)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="сохранить отчёт в JSON-файл")
+    parser.add_argument("--cassette", default="cassette", help="каталог кассеты для record/replay")
+    parser.add_argument("--cassette-speed", type=float, default=1.0,
+                        help="во сколько раз ускорить записанные задержки при replay")
+    parser.add_argument("--live", action="store_true", help="record: ходить в настоящие апстримы, а не в заглушку")
+    parser.add_argument("--baseline", help="replay: отчёт прошлого прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="replay: допустимое падение probes/s и hits/s относительно baseline")
+    return parser
+
+
+async def serve_broker(port: int):
+    stand_in = await MiniRedis().start("127.0.0.1", port)
+    print(f"Заглушка Redis слушает 127.0.0.1:{stand_in.port}")
+    async with stand_in.server:
+        await stand_in.server.serve_forever()
+
+
+def run_load(args) -> List[Dict]:
+    reports = []
+    for users in [int(u) for u in args.users.split(",") if u.strip()]:
+        tg = FakeTelegram(args.tg_retry_ratio, args.tg_retry_after, args.tg_latency_ms)
+        report = asyncio.run(
+            run_scenario(
+                users,
+                args.source,
+                args.length,
+                args.count,
+                args.duration,
+                build_profiles(args),
+                tg,
+                workers=args.workers,
+                measure_memory=args.memory,
+                seed=args.seed,
+                shards=args.shards,
+                proxies=args.proxies,
+                proxy_rate=args.proxy_rate,
+                max_active=args.max_active,
+                max_queue=args.max_queue,
+            )
+        )
+        reports.append(report)
+        print(json.dumps(report, ensure_ascii=False))
+    return reports
+
+
+def main():
+    args = build_parser().parse_args()
+    bot_logger.setLevel(logging.WARNING)
+    if args.mode == "broker":
+        asyncio.run(serve_broker(args.port))
+        return
+    ok = True
+    if args.mode in ("record", "replay"):
+        report = asyncio.run(run_cassette(args))
+        print(json.dumps(report, ensure_ascii=False))
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                ok = compare_reports(report, json.load(f), args.max_regression)
+        reports = report
+    elif args.mode == "generators":
+        reports = compare_generators(args.probes, args.seed)
+        for report in reports:
+            print(json.dumps(report, ensure_ascii=False))
+    else:
+        reports = run_load(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
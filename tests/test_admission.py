@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+import bot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bot.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_queue_is_bounded_and_promoted_in_order(clock):
+    async def run():
+        admission = bot.AdmissionControl(max_active=2, max_queue=2)
+        assert admission.admit(1) is None and admission.admit(2) is None
+        assert not admission.has_room() and not admission.shed()
+        third, fourth = admission.admit(3), admission.admit(4)
+        assert admission.position(3) == 1 and admission.position(4) == 2
+        assert admission.shed() and admission.rejected == 1
+        admission.release(2)
+        assert third.done() and not fourth.done()
+        assert admission.active == {1, 3} and admission.position(4) == 1
+        assert not admission.shed()
+        admission.release(1)
+        assert fourth.done()
+        assert admission.summary() == {"active": 2, "waiting": 0, "max_waiting": 2, "rejected": 1}
+
+    asyncio.run(run())
+
+
+def test_released_waiter_leaves_the_queue(clock):
+    async def run():
+        admission = bot.AdmissionControl(max_active=1, max_queue=5)
+        admission.admit(1)
+        second, third = admission.admit(2), admission.admit(3)
+        admission.release(2)
+        assert second.cancelled() and admission.position(3) == 1
+        admission.release(1)
+        assert third.result() is True and admission.active == {3}
+
+    asyncio.run(run())
+
+
+def test_eta_from_durations_then_throughput(clock):
+    async def run():
+        admission = bot.AdmissionControl(max_active=2, max_queue=5)
+        admission.admit(1)
+        admission.admit(2)
+        assert admission.eta(1) is None
+        clock.now += 30
+        admission.release(1)
+        assert admission.eta(3) == 60
+        clock.now += 30
+        admission.release(2)
+        assert admission.eta(3) == 45
+
+    asyncio.run(run())
+
+
+def test_queue_text_shows_position_and_wait(clock):
+    async def run():
+        instance = bot.ImageBot()
+        instance.admission = bot.AdmissionControl(max_active=1, max_queue=5)
+        instance.admission.admit(1)
+        instance.admission.admit(2)
+        instance.admission.admit(3)
+        text = instance.queue_text("PRNT.SC", 3)
+        assert "Место в очереди: 2 из 2" in text
+        assert "станет известно" in text
+        clock.now += 75
+        instance.admission.release(1)
+        text = instance.queue_text("PRNT.SC", 3)
+        assert "Место в очереди: 1 из 1" in text
+        assert "Примерное ожидание: 1м 15с" in text
+
+    asyncio.run(run())
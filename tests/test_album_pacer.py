@@ -0,0 +1,75 @@
+import pytest
+
+import bot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bot.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def hits(pacer, count, now):
+    for _ in range(count):
+        pacer.record_hit(now)
+
+
+def test_first_hit_is_sent_immediately_then_interval_doubles(clock):
+    pacer = bot.AlbumPacer(min_interval=2, max_interval=30, max_size=10)
+    assert not pacer.should_flush(0, clock.now)
+    hits(pacer, 1, clock.now)
+    assert pacer.should_flush(1, clock.now)
+    pacer.record_send(clock.now)
+    hits(pacer, 1, 1001)
+    assert pacer.interval(1001) == 2
+    assert not pacer.should_flush(1, 1002.9)
+    assert pacer.should_flush(1, 1003)
+    pacer.record_send(1003)
+    assert pacer.interval(1003) == 4
+    pacer.flushes = 10
+    assert pacer.interval(1003) == 30
+
+
+def test_album_is_sent_once_it_reaches_the_batch_target(clock):
+    pacer = bot.AlbumPacer(min_interval=2, max_interval=30, max_size=10)
+    hits(pacer, 1, clock.now)
+    pacer.record_send(clock.now)
+    pacer.record_send(clock.now)
+    hits(pacer, 9, 1010)
+    # 10 находок за 10 секунд и интервал 4 секунды — альбом из 4 картинок
+    assert pacer.target_size(1010) == 4
+    assert not pacer.should_flush(3, 1010)
+    assert pacer.should_flush(4, 1010)
+    hits(pacer, 40, 1010)
+    assert pacer.target_size(1010) == 10
+
+
+def test_exhausted_budget_defers_the_album(clock):
+    pacer = bot.AlbumPacer(min_interval=2, max_interval=30, max_size=10, chat_budget=3, budget_window=60)
+    for now in (1000, 1001, 1002):
+        hits(pacer, 1, now)
+        pacer.record_send(now)
+    hits(pacer, 1, 1003)
+    assert pacer.budget(1003) == 0
+    assert pacer.target_size(1003) == 10
+    assert pacer.interval(1003) == 57
+    assert not pacer.should_flush(10, 1003)
+    assert not pacer.should_flush(1, 1059)
+    assert pacer.should_flush(10, 1060.5)
+
+
+def test_retry_after_blocks_sending(clock):
+    pacer = bot.AlbumPacer()
+    hits(pacer, 1, clock.now)
+    pacer.record_retry_after(15)
+    assert not pacer.should_flush(10, 1014)
+    assert pacer.should_flush(10, 1015)
@@ -0,0 +1,66 @@
+import asyncio
+
+import bot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def test_in_memory_broker_sweeps_expired_keys(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bot.time, "time", clock.time)
+
+    async def run():
+        broker = bot.InMemoryBroker()
+        for _ in range(3600):
+            for host in ("i.imgur.com", "prnt.sc"):
+                await broker.incr(f"rate:{host}:{int(clock.now)}", ttl=2)
+            clock.now += 1
+        await broker.set("flood:imgur", 1, ttl=60)
+        await broker.set("admins", "1")
+        assert len(broker.values) <= 2 * (broker.sweep_interval + 2) + 2
+        clock.now += 3600
+        await broker.set("cancel:job", 1, ttl=10)
+        assert set(broker.values) == {"admins", "cancel:job"}
+
+    asyncio.run(run())
+
+
+def test_in_memory_broker_counts_within_window(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bot.time, "time", clock.time)
+
+    async def run():
+        broker = bot.InMemoryBroker()
+        assert [await broker.incr("rate:x:1", ttl=2) for _ in range(3)] == [1, 2, 3]
+        clock.now += 2
+        assert await broker.incr("rate:x:1", ttl=2) == 1
+        assert await broker.get("rate:x:1") == 1
+
+    asyncio.run(run())
+
+
+def test_redis_broker_short_consume_does_not_block():
+    from benchmark import MiniRedis
+
+    async def run():
+        server = await MiniRedis().start()
+        broker = bot.RedisBroker(f"redis://127.0.0.1:{server.port}")
+        try:
+            started = bot.time.monotonic()
+            assert await broker.consume("results:job", timeout=0.01) is None
+            assert bot.time.monotonic() - started < 0.5
+            await broker.publish("results:job", {"analyzed": 1})
+            await broker.publish("results:job", {"analyzed": 2})
+            assert await broker.consume("results:job", timeout=0.01) == {"analyzed": 1}
+            assert await broker.consume("results:job", timeout=1) == {"analyzed": 2}
+        finally:
+            await broker.close()
+            server.server.close()
+
+    asyncio.run(run())
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+
+import bot
+
+
+def test_full_bulkhead_rejects_and_wakes_one_waiter():
+    async def run():
+        bulkhead = bot.Bulkhead("test", workers=1, max_queue=1)
+        release = threading.Event()
+        first = bulkhead.submit(release.wait)
+        second = bulkhead.submit(release.wait)
+        with pytest.raises(bot.BulkheadFull):
+            bulkhead.submit(release.wait)
+        assert bulkhead.rejected == 1
+        waiters = [asyncio.ensure_future(bulkhead.wait_room()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert not any(w.done() for w in waiters)
+        release.set()
+        await asyncio.gather(first, second)
+        await asyncio.sleep(0)
+        assert all(w.done() for w in waiters)
+        bulkhead.close()
+
+    asyncio.run(run())
+
+
+def test_wait_room_returns_at_once_when_there_is_room():
+    async def run():
+        bulkhead = bot.Bulkhead("test", workers=1, max_queue=0)
+        await asyncio.wait_for(bulkhead.wait_room(), timeout=1)
+        bulkhead.close()
+
+    asyncio.run(run())
+
+
+def test_bulkhead_queue_follows_admission():
+    instance = bot.ImageBot()
+    instance.admission.max_active = 50
+    instance.size_bulkheads()
+    settings = instance.search_settings["imgur"]
+    assert instance.bulkheads["imgur"].max_queue == 50 * settings["batch"] - settings["workers"]
+    instance.admission.max_active = 0
+    instance.size_bulkheads()
+    assert instance.bulkheads["imgur"].max_queue == settings["queue"]
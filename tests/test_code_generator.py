@@ -0,0 +1,21 @@
+import bot
+
+
+def generate(seed, n=200):
+    gen = bot.CodeGenerator(bot.SOURCE_ALPHABETS["imgur"], 7, seed=seed)
+    codes = []
+    for i in range(n):
+        code = gen.generate()
+        gen.observe(code, i % 7 == 0)
+        codes.append(code)
+    return codes
+
+
+def test_seeded_generator_is_reproducible():
+    assert generate(7) == generate(7)
+    assert generate(7) != generate(8)
+
+
+def test_generated_codes_use_the_alphabet():
+    alphabet = set(bot.SOURCE_ALPHABETS["imgur"])
+    assert all(len(code) == 7 and set(code) <= alphabet for code in generate(1))
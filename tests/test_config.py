@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def config():
+    return bot.BotConfig()
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", float("nan"), float("inf")])
+def test_coerce_rejects_non_finite(config, value):
+    with pytest.raises(ValueError, match="конечное"):
+        config.coerce("group_timeout", value)
+
+
+def test_coerce_numbers(config):
+    assert config.coerce("imgur.batch", "12") == 12
+    assert config.coerce("imgur.timeout", 2) == 2.0
+    with pytest.raises(ValueError, match="целое"):
+        config.coerce("imgur.batch", 2.5)
+    with pytest.raises(ValueError, match="нужно число"):
+        config.coerce("imgur.batch", True)
+    with pytest.raises(ValueError, match="допустимо"):
+        config.coerce("imgur.batch", 0)
+
+
+def test_coerce_flood_reserve(config):
+    assert config.coerce("flood_reserve", "[[0, 20], [600, 600]]") == [[600, 600], [0, 20]]
+    for bad in ("[[-1, 20]]", "[[0, -5]]", "[[0, \"x\"]]", "[[0, NaN]]", "[0, 20]", "not json"):
+        with pytest.raises(ValueError):
+            config.coerce("flood_reserve", bad)
+
+
+def test_read_layers_file_env_and_overrides(tmp_path, monkeypatch):
+    path = tmp_path / "bot_config.json"
+    path.write_text(json.dumps({"imgur": {"batch": 20, "workers": 4}, "group_timeout": 10}))
+    monkeypatch.setenv("BOT_IMGUR_BATCH", "30")
+    config = bot.BotConfig(str(path), {"group_timeout": 5})
+    values = config.read()
+    assert values["imgur.batch"] == 30
+    assert values["imgur.workers"] == 4
+    assert values["group_timeout"] == 5
+    assert values["prnt.batch"] == bot.SEARCH_SETTINGS["prnt"]["batch"]
+
+
+def test_read_reports_every_error(tmp_path):
+    path = tmp_path / "bot_config.json"
+    path.write_text(json.dumps({"imgur": {"batch": "many"}, "bogus": 1}))
+    with pytest.raises(bot.ConfigError) as info:
+        bot.BotConfig(str(path)).read()
+    assert "imgur.batch" in str(info.value) and "bogus" in str(info.value)
+
+
+def test_apply_config_stays_on_the_instance(tmp_path):
+    path = tmp_path / "bot_config.json"
+    path.write_text(json.dumps({"imgur": {"batch": 3}, "flood_reserve": [[0, 1]]}))
+    first = bot.ImageBot()
+    first.use_config(bot.BotConfig(str(path)))
+    second = bot.ImageBot()
+    assert first.search_settings["imgur"]["batch"] == 3
+    assert first.flood_reserve == [(0, 1)]
+    assert bot.SEARCH_SETTINGS["imgur"]["batch"] == second.search_settings["imgur"]["batch"] == 10
+    assert bot.add_flood_control_reserve(30) == 50
+    assert bot.add_flood_control_reserve(30, first.flood_reserve) == 31
@@ -0,0 +1,34 @@
+import socket
+
+import bot
+
+
+def test_image_bot_does_not_patch_resolver():
+    original = socket.getaddrinfo
+    bot.ImageBot()
+    assert socket.getaddrinfo is original
+
+
+def test_install_and_uninstall_restore_resolver():
+    original = socket.getaddrinfo
+    cache = bot.DnsCache()
+    cache.install()
+    try:
+        assert socket.getaddrinfo.__self__ is cache
+        cache.install()
+        assert cache.resolver is original
+    finally:
+        cache.uninstall()
+    assert socket.getaddrinfo is original
+
+
+def test_tracked_hosts_are_cached():
+    calls = []
+    cache = bot.DnsCache()
+    cache.resolver = lambda *key: calls.append(key) or [("addr", key[0])]
+    cache.track("i.imgur.com")
+    assert cache.getaddrinfo("i.imgur.com", 443) == [("addr", "i.imgur.com")]
+    cache.getaddrinfo("i.imgur.com", 443)
+    cache.getaddrinfo("example.com", 443)
+    assert [key[0] for key in calls] == ["i.imgur.com", "example.com"]
+    assert cache.hits == 1 and cache.misses == 1
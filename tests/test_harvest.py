@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import itertools
+import json
+
+import bot
+
+
+def test_harvest_counts_only_answered_probes(tmp_path):
+    instance = bot.ImageBot()
+    kinds = itertools.cycle([
+        bot.ProbeOutcome.REJECTED,
+        bot.ProbeOutcome.TIMEOUT,
+        bot.ProbeOutcome.NETWORK,
+        bot.ProbeOutcome.MISS,
+        bot.ProbeOutcome.HIT,
+    ])
+    codes = (f"c{i:04d}" for i in itertools.count())
+
+    async def probe_code(source, code):
+        kind = next(kinds)
+        if kind == bot.ProbeOutcome.HIT:
+            return bot.ProbeOutcome(kind, f"https://i.imgur.com/{code}.jpg", "jpg")
+        return bot.ProbeOutcome(kind)
+
+    instance.probe_code = probe_code
+    instance.next_code = lambda source, length: next(codes)
+    out = tmp_path / "imgur5.jsonl"
+    args = argparse.Namespace(source="imgur", length=5, format=None, out=str(out), checkpoint=None,
+                              checkpoint_interval=60.0, count=3, concurrency=1)
+    asyncio.run(bot.run_harvest(instance, args))
+    state = json.loads((tmp_path / "imgur5.jsonl.checkpoint").read_text())
+    assert state["found"] == 3
+    assert state["probed"] == 6
+    assert state["failed"] == 6
+    assert state["rejected"] == 3
+    assert len(out.read_text().splitlines()) == 3
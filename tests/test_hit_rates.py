@@ -0,0 +1,63 @@
+import asyncio
+import json
+import random
+import threading
+
+import bot
+
+NOW = 1_700_000_000.0
+
+
+def filled_store(path):
+    store = bot.HitRateStore(str(path))
+    for i in range(300):
+        store.record("imgur", 5, i % 10 == 0, 1.0, now=NOW)
+        store.record("prnt", 6, i % 100 == 0, 1.0, now=NOW)
+    return store
+
+
+def test_saved_hit_rates_weight_the_mixer(tmp_path, monkeypatch):
+    path = tmp_path / "hit_rates.json"
+    filled_store(path).save()
+    monkeypatch.setattr(bot.time, "time", lambda: NOW)
+    instance = bot.ImageBot()
+    assert instance.use_hit_rates(str(path)) == 2
+    rates = instance.mixer.prior_rates
+    assert rates["imgur"] > rates["prnt"]
+    assert "pastenow" not in rates
+    random.seed(1)
+    picks = instance.mixer.pick(["imgur", "prnt"], 1000)
+    assert picks.count("imgur") > 3 * picks.count("prnt")
+
+
+def test_reload_keeps_slots(tmp_path):
+    path = tmp_path / "hit_rates.json"
+    filled_store(path).save()
+    store = bot.HitRateStore(str(path))
+    store.load()
+    assert store.totals("imgur", 5, now=NOW) == (300, 30, 300.0)
+    assert store.hit_ratio("prnt", 6, now=NOW) == 4 / 302
+
+
+def test_periodic_save_writes_off_the_loop(tmp_path, monkeypatch):
+    path = tmp_path / "hit_rates.json"
+    store = filled_store(path)
+    store.save_interval = 0.01
+    writers = []
+    save_checkpoint = bot.save_checkpoint
+
+    def recording_save(target, state):
+        writers.append(threading.current_thread())
+        save_checkpoint(target, state)
+
+    monkeypatch.setattr(bot, "save_checkpoint", recording_save)
+
+    async def run():
+        store.start()
+        while not writers:
+            await asyncio.sleep(0.01)
+        store.task.cancel()
+
+    asyncio.run(run())
+    assert writers[0] is not threading.main_thread()
+    assert json.loads(path.read_text())["slot_seconds"] == 3600
@@ -0,0 +1,77 @@
+import struct
+
+import pytest
+
+import bot
+
+SOI = b"\xFF\xD8"
+
+
+def segment(marker, payload):
+    return bytes([0xFF, marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def sof(marker, width, height):
+    return segment(marker, struct.pack(">BHHB", 8, height, width, 3) + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01")
+
+
+def test_baseline_jpeg():
+    data = SOI + segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00") + sof(0xC0, 640, 480)
+    assert bot.jpeg_dimensions(data) == (640, 480)
+
+
+def test_progressive_jpeg_after_exif_tables_and_fill_bytes():
+    data = (
+        SOI
+        + segment(0xE1, b"Exif\x00\x00" + b"\x00" * 300)
+        + segment(0xDB, b"\x00" * 64)
+        + segment(0xC4, b"\x00" * 30)
+        + segment(0xCC, b"\x00\x00")
+        + b"\xFF\xFF"
+        + sof(0xC2, 1920, 1080)
+    )
+    assert bot.jpeg_dimensions(data) == (1920, 1080)
+
+
+def test_truncated_jpeg_needs_more_data():
+    head = SOI + segment(0xE1, b"\x00" * 100)
+    data = head + sof(0xC0, 640, 480)
+    assert bot.jpeg_dimensions(data[:50]) is None
+    assert bot.jpeg_dimensions(data[:len(head) + 7]) is None
+    assert bot.jpeg_dimensions(data[:len(head) + 9]) == (640, 480)
+
+
+@pytest.mark.parametrize("marker", [0xDA, 0xD9])
+def test_jpeg_without_frame_header(marker):
+    data = SOI + segment(0xDB, b"\x00" * 64) + bytes([0xFF, marker]) + b"\x00" * 20
+    assert bot.jpeg_dimensions(data) is None
+
+
+def test_garbage_is_not_a_jpeg():
+    assert bot.jpeg_dimensions(SOI + b"\x00" * 100) is None
+
+
+def test_png_and_gif():
+    ihdr = struct.pack(">IIBBBBB", 800, 600, 8, 2, 0, 0, 0)
+    png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr
+    assert bot.image_dimensions("png", png) == (800, 600)
+    assert bot.image_dimensions("png", png[:20]) is None
+    gif = b"GIF89a" + struct.pack("<HH", 320, 200) + b"\x00\x00\x00"
+    assert bot.image_dimensions("gif", gif) == (320, 200)
+    assert bot.image_dimensions("gif", gif[:8]) is None
+
+
+def test_image_dimensions_dispatch():
+    assert bot.image_dimensions("jpg", SOI + sof(0xC0, 10, 20)) == (10, 20)
+    assert bot.image_dimensions("webp", b"RIFF" + b"\x00" * 40) is None
+
+
+@pytest.mark.parametrize("size, allowed", [
+    ((640, 480), True),
+    ((32, 480), False),
+    ((6000, 480), False),
+    ((4000, 100), False),
+    ((2000, 100), True),
+])
+def test_dimensions_allowed(size, allowed):
+    assert bot.dimensions_allowed(*size, bot.IMAGE_LIMITS) is allowed
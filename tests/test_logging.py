@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_import_leaves_logging_alone(tmp_path):
+    code = (
+        "import logging, threading, bot;"
+        "assert not logging.getLogger().handlers;"
+        "assert bot.log_listener is None;"
+        "assert threading.active_count() == 1"
+    )
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, check=True)
+    assert not (tmp_path / "image_bot.log").exists()
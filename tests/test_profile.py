@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+import bot
+
+
+def test_profile_process_returns_stacks(monkeypatch):
+    monkeypatch.setattr(bot, "sample_stacks", lambda duration: {"main;run": 3})
+    assert asyncio.run(bot.profile_process(0.01)) == {"main;run": 3}
+
+
+def test_profile_process_propagates_sampler_error(monkeypatch):
+    def broken(duration):
+        raise RuntimeError("sampler failed")
+
+    monkeypatch.setattr(bot, "sample_stacks", broken)
+
+    async def run():
+        return await asyncio.wait_for(bot.profile_process(0.01), timeout=5)
+
+    with pytest.raises(RuntimeError, match="sampler failed"):
+        asyncio.run(run())
+
+
+def test_loop_monitor_leaves_handle_alone_by_default():
+    original = asyncio.Handle._run
+
+    async def run():
+        monitor = bot.LoopLagMonitor()
+        monitor.start()
+        assert asyncio.Handle._run is original
+        monitor.task.cancel()
+
+    asyncio.run(run())
@@ -0,0 +1,106 @@
+import pytest
+import requests
+
+import bot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bot.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(bot.time, "sleep", clock.sleep)
+    return clock
+
+
+class Reply:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class StubAdapter:
+    # Отвечает по очереди заготовленными ответами или исключениями
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def close(self):
+        pass
+
+
+def stub_proxy(name, *replies, limits=None):
+    proxy = bot.EgressProxy(f"http://{name}:3128", limits or {})
+    proxy.adapter = StubAdapter(*replies)
+    return proxy
+
+
+def get(pool, url="https://prnt.sc/abc123"):
+    return pool.send(requests.Request("GET", url).prepare())
+
+
+def test_each_proxy_has_its_own_host_budget(clock):
+    first = stub_proxy("first", Reply(200), limits={"prnt.sc": 1})
+    second = stub_proxy("second", Reply(200), limits={"prnt.sc": 1})
+    pool = bot.ProxyPool([first, second], max_wait=0.5)
+    assert pool.acquire("prnt.sc", set(), clock.now + 0.5) is first
+    assert pool.acquire("prnt.sc", set(), clock.now + 0.5) is second
+    assert pool.acquire("prnt.sc", set(), clock.now + 0.5) is None
+    assert clock.now == 1000.0
+    assert pool.acquire("imgur.com", set(), clock.now + 0.5) is not None
+    assert pool.acquire("prnt.sc", set(), clock.now + 2) is not None
+    assert clock.now == 1001.0
+
+
+def test_network_error_fails_over_to_next_proxy(clock):
+    first = stub_proxy("first", requests.exceptions.ConnectionError("down"))
+    second = stub_proxy("second", Reply(200))
+    pool = bot.ProxyPool([first, second], failure_threshold=1, base_cooldown=30)
+    assert get(pool).status_code == 200
+    assert (first.failed, second.requests) == (1, 1)
+    assert not first.ready("prnt.sc", clock.now) and not first.ready("imgur.com", clock.now)
+    assert first.in_flight == second.in_flight == 0
+
+
+def test_throttled_proxy_pauses_only_for_that_host(clock):
+    first = stub_proxy("first", Reply(429, {"Retry-After": "60"}), Reply(200))
+    second = stub_proxy("second", Reply(200))
+    pool = bot.ProxyPool([first, second])
+    assert get(pool).status_code == 200
+    assert first.throttled == 1 and second.adapter.sent == 1
+    assert not first.ready("prnt.sc", clock.now) and first.ready("imgur.com", clock.now)
+    clock.now += 60
+    assert first.ready("prnt.sc", clock.now)
+
+
+def test_every_proxy_exhausted(clock):
+    down = [stub_proxy(name, requests.exceptions.Timeout(name)) for name in ("first", "second")]
+    with pytest.raises(requests.exceptions.Timeout):
+        get(bot.ProxyPool(down))
+    throttled = [Reply(429), Reply(429)]
+    pool = bot.ProxyPool([stub_proxy("first", throttled[0]), stub_proxy("second", throttled[1])])
+    assert get(pool) is throttled[1]
+    assert throttled[0].closed and not throttled[1].closed
+    with pytest.raises(requests.exceptions.ConnectionError, match="Нет свободного прокси"):
+        get(pool)
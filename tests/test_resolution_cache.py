@@ -0,0 +1,87 @@
+import pytest
+
+import bot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bot.time, "time", clock.time)
+    return clock
+
+
+def test_found_and_empty_codes_expire_separately(clock):
+    cache = bot.ResolutionCache(ttl=100, negative_ttl=10)
+    cache.put("prnt", "abc123", "https://image.prntscr.com/image/abc.png")
+    cache.put("prnt", "empty1", bot.ProbeOutcome(bot.ProbeOutcome.MISS))
+    cache.put("pastenow", "holder", bot.ProbeOutcome(bot.ProbeOutcome.PLACEHOLDER, "https://x/removed.png"))
+    assert cache.get("prnt", "abc123") == "https://image.prntscr.com/image/abc.png"
+    assert cache.get("prnt", "empty1").kind == bot.ProbeOutcome.MISS
+    assert cache.get("pastenow", "holder").url == "https://x/removed.png"
+    clock.now += 10
+    assert cache.get("prnt", "empty1") is None
+    assert cache.get("pastenow", "holder") is None
+    assert cache.get("prnt", "abc123") is not None
+    clock.now += 90
+    assert cache.get("prnt", "abc123") is None
+    assert not cache.entries
+
+
+@pytest.mark.parametrize("kind", [
+    bot.ProbeOutcome.TIMEOUT,
+    bot.ProbeOutcome.THROTTLED,
+    bot.ProbeOutcome.NETWORK,
+    bot.ProbeOutcome.ERROR,
+    bot.ProbeOutcome.REJECTED,
+])
+def test_unavailable_results_are_not_cached(clock, kind):
+    cache = bot.ResolutionCache()
+    cache.put("prnt", "abc123", bot.ProbeOutcome(kind))
+    assert cache.get("prnt", "abc123") is None
+    assert not cache.dirty
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = bot.ResolutionCache(max_size=2)
+    cache.put("prnt", "a", "https://x/a.png")
+    cache.put("prnt", "b", "https://x/b.png")
+    assert cache.get("prnt", "a")
+    cache.put("prnt", "c", "https://x/c.png")
+    assert cache.get("prnt", "b") is None
+    assert cache.get("prnt", "a") and cache.get("prnt", "c")
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_save_and_load_round_trip(clock, tmp_path):
+    path = tmp_path / "resolutions.json"
+    cache = bot.ResolutionCache(ttl=100, negative_ttl=10, path=str(path))
+    cache.put("prnt", "found", "https://x/found.png")
+    cache.put("prnt", "empty", bot.ProbeOutcome(bot.ProbeOutcome.MISS))
+    cache.save()
+    assert not cache.dirty
+    clock.now += 20
+    restored = bot.ResolutionCache(path=str(path))
+    assert restored.load() == 1
+    assert restored.get("prnt", "found") == "https://x/found.png"
+    assert restored.get("prnt", "empty") is None
+    clock.now += 100
+    assert bot.ResolutionCache(path=str(path)).load() == 0
+
+
+def test_load_respects_capacity(clock, tmp_path):
+    path = tmp_path / "resolutions.json"
+    cache = bot.ResolutionCache(path=str(path))
+    for code in "abcd":
+        cache.put("prnt", code, f"https://x/{code}.png")
+    cache.save()
+    restored = bot.ResolutionCache(max_size=2, path=str(path))
+    assert restored.load() == 2
+    assert list(restored.entries) == ["prnt:c", "prnt:d"]
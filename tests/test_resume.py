@@ -0,0 +1,50 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import bot
+
+
+class FakeTelegram:
+    def __init__(self, blocked):
+        self.blocked = blocked
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id in self.blocked:
+            raise RuntimeError("Forbidden: bot was blocked by the user")
+        self.sent.append(chat_id)
+
+
+def entry(user_id, attempts=0):
+    return {"user_id": user_id, "chat_id": user_id, "source": "imgur", "length": 5, "count": 10,
+            "found": 2, "sent_ids": [], "attempts": attempts}
+
+
+def resume(tmp_path, entries, blocked):
+    path = tmp_path / "sessions_checkpoint.json"
+    path.write_text(json.dumps({"sessions": entries}))
+    instance = bot.ImageBot()
+    instance.sessions_file = str(path)
+    started = []
+
+    async def start_search(update, source, length, count):
+        started.append((update.effective_user.id, count))
+
+    instance.start_search = start_search
+    application = SimpleNamespace(bot=FakeTelegram(blocked))
+    asyncio.run(instance.resume_sessions(application))
+    return path, started
+
+
+def test_checkpoint_removed_after_all_sessions_resume(tmp_path):
+    path, started = resume(tmp_path, [entry(1), entry(2)], blocked=set())
+    assert started == [(1, 8), (2, 8)]
+    assert not path.exists()
+
+
+def test_failed_sessions_stay_in_checkpoint(tmp_path):
+    path, started = resume(tmp_path, [entry(1), entry(2), entry(3, attempts=bot.RESUME_ATTEMPTS - 1)], blocked={2, 3})
+    assert started == [(1, 8)]
+    kept = json.loads(path.read_text())["sessions"]
+    assert [(e["user_id"], e["attempts"]) for e in kept] == [(2, 1)]
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import bot
+
+
+def test_concurrent_calls_share_one_request():
+    calls = []
+    release = threading.Event()
+
+    def fetch(code):
+        calls.append(code)
+        release.wait(5)
+        return bot.ProbeOutcome(bot.ProbeOutcome.HIT, f"https://i.imgur.com/{code}.jpg", "jpg")
+
+    async def run():
+        flight = bot.SingleFlight()
+        waiters = [asyncio.ensure_future(flight.run(("CHECK", "abc"), fetch, "abc")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        assert len({id(result) for result in results}) == 1
+        assert flight.coalesced == 2
+        await flight.run(("CHECK", "abc"), fetch, "abc")
+        assert flight.memo_hits == 1
+
+    asyncio.run(run())
+    assert calls == ["abc"]
+
+
+def test_cancelling_one_waiter_keeps_the_request():
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        return bot.ProbeOutcome(bot.ProbeOutcome.MISS)
+
+    async def run():
+        flight = bot.SingleFlight()
+        first = asyncio.ensure_future(flight.run(("GET", "x"), fetch))
+        second = asyncio.ensure_future(flight.run(("GET", "x"), fetch))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+        assert (await second).kind == bot.ProbeOutcome.MISS
+
+    asyncio.run(run())
+
+
+def test_unanswered_outcomes_and_errors_are_not_memoized():
+    outcomes = [
+        bot.ProbeOutcome(bot.ProbeOutcome.TIMEOUT),
+        bot.ProbeOutcome(bot.ProbeOutcome.THROTTLED, retry_after=5),
+        bot.ProbeOutcome(bot.ProbeOutcome.NETWORK),
+        RuntimeError("boom"),
+        bot.ProbeOutcome(bot.ProbeOutcome.MISS),
+    ]
+    calls = []
+
+    def fetch():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def run():
+        flight = bot.SingleFlight()
+        kinds = []
+        for _ in range(6):
+            try:
+                kinds.append((await flight.run(("CHECK", "y"), fetch)).kind)
+            except RuntimeError:
+                kinds.append("error")
+        return kinds
+
+    outcome = bot.ProbeOutcome
+    assert asyncio.run(run()) == [outcome.TIMEOUT, outcome.THROTTLED, outcome.NETWORK, "error", outcome.MISS, outcome.MISS]
+    assert len(calls) == 5
@@ -0,0 +1,31 @@
+import bot
+
+TEMPLATES = ["https://iili.io/{code}.jpg", "https://iili.io/{code}.png", "https://iili.io/{code}.gif"]
+
+
+def variants_with(stats):
+    variants = bot.UrlVariants(list(TEMPLATES))
+    for template, (tries, hits) in zip(TEMPLATES, stats):
+        variants.stats[template] = [tries, hits]
+    return variants
+
+
+def test_fresh_fallbacks_only_on_a_fraction_of_misses(monkeypatch):
+    variants = variants_with([(0, 0), (0, 0), (0, 0)])
+    monkeypatch.setattr(bot.random, "random", lambda: variants.explore + 0.01)
+    assert variants.plan() == TEMPLATES[:1]
+    monkeypatch.setattr(bot.random, "random", lambda: variants.explore - 0.01)
+    assert variants.plan() == TEMPLATES
+
+
+def test_productive_fallback_always_tried_best_first(monkeypatch):
+    monkeypatch.setattr(bot.random, "random", lambda: 0.99)
+    variants = variants_with([(100, 10), (30, 3), (20, 4)])
+    assert variants.plan() == [TEMPLATES[0], TEMPLATES[2], TEMPLATES[1]]
+
+
+def test_useless_fallback_drops_to_refresh_rate(monkeypatch):
+    variants = variants_with([(100, 10), (200, 0), (20, 0)])
+    monkeypatch.setattr(bot.random, "random", lambda: (variants.refresh + variants.explore) / 2)
+    # .png уже точно не окупается, про .gif после 20 проверок ещё ничего не ясно
+    assert variants.plan() == [TEMPLATES[0], TEMPLATES[2]]
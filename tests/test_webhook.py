@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import bot
+
+
+class SlowApplication:
+    def __init__(self):
+        self.bot = None
+        self.done = []
+        self.release = asyncio.Event()
+
+    async def process_update(self, update):
+        if update.effective_chat.id == 1:
+            await self.release.wait()
+        self.done.append(update.update_id)
+
+
+def message(update_id, chat_id):
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": 0, "chat": {"id": chat_id, "type": "private"}, "text": "x"},
+    }
+
+
+async def post(receiver, payload, secret=None):
+    response = {}
+    headers = [(b"x-telegram-bot-api-secret-token", secret.encode())] if secret else []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}
+
+    async def send(event):
+        if event["type"] == "http.response.start":
+            response["status"] = event["status"]
+
+    await receiver({"type": "http", "method": "POST", "path": "/telegram", "headers": headers}, receive, send)
+    return response["status"]
+
+
+def test_slow_chat_does_not_block_others():
+    async def run():
+        application = SlowApplication()
+        receiver = bot.WebhookReceiver(application)
+        receiver.start()
+        assert await post(receiver, [message(1, 1), message(2, 1)]) == 200
+        await asyncio.sleep(0.05)
+        assert await post(receiver, [message(3, 2), message(4, 2)]) == 200
+        await asyncio.sleep(0.05)
+        assert application.done == [3, 4]
+        application.release.set()
+        await asyncio.sleep(0.05)
+        assert application.done == [3, 4, 1, 2]
+        assert not receiver.chats and receiver.pending == 0
+        await receiver.stop()
+
+    asyncio.run(run())
+
+
+def test_pending_updates_count_against_queue_limit():
+    async def run():
+        application = SlowApplication()
+        receiver = bot.WebhookReceiver(application, queue_size=2)
+        receiver.start()
+        assert await post(receiver, [message(1, 1), message(2, 1)]) == 200
+        await asyncio.sleep(0.05)
+        assert await post(receiver, message(3, 1)) == 503
+        await receiver.stop()
+
+    asyncio.run(run())
+
+
+def test_secret_is_checked():
+    async def run():
+        receiver = bot.WebhookReceiver(SlowApplication(), secret="s3cret")
+        assert await post(receiver, message(1, 2)) == 403
+        assert await post(receiver, message(1, 2), secret="s3cret") == 200
+
+    asyncio.run(run())